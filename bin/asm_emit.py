@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# bin/asm_emit.py
+#
+# Tenable Attack Surface Management – shared event output and JSON parsing
+#
+# NDJSON events are buffered and written to stdout in OUT_FLUSH_BYTES
+# chunks. The buffer is shared by every collector in the process (see
+# tenable_asm_all), so appends and flushes hold _OUT_LOCK and only whole
+# lines ever reach stdout.
+
+import json
+import sys
+import threading
+from typing import Any, Dict, Iterator
+
+import requests
+
+try:
+    # Optional: faster JSON encode/decode when the wheel is available
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # Second choice when orjson is missing: C encoder, no Rust wheel needed
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    # Optional: stream list items instead of buffering the whole body
+    import ijson
+except ImportError:
+    ijson = None
+
+if orjson is not None:
+    # orjson writes UTF-8 bytes (same output as ensure_ascii=False)
+    dumps = orjson.dumps
+elif ujson is not None:
+    def dumps(obj: Any) -> bytes:
+        return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode("utf-8")
+else:
+    # Stdlib encoder built once (json.dumps with kwargs builds one per call);
+    # compact separators match orjson's output byte for byte
+    _JSON_ENCODE = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+    def dumps(obj: Any) -> bytes:
+        return _JSON_ENCODE(obj).encode("utf-8")
+
+# stdout batching
+OUT_FLUSH_BYTES = 65536
+
+_OUT_BUF = bytearray()
+_OUT_LOCK = threading.Lock()
+
+
+def emit(event: Dict[str, Any]) -> None:
+    # NDJSON is batched; one write() per OUT_FLUSH_BYTES instead of per event
+    line = dumps(event)
+    with _OUT_LOCK:
+        _OUT_BUF.extend(line)
+        _OUT_BUF.extend(b"\n")
+        full = len(_OUT_BUF) >= OUT_FLUSH_BYTES
+    if full:
+        flush_events()
+
+
+def emit_bytes(line: bytes) -> None:
+    """Buffer one pre-serialized NDJSON line (including its newline)."""
+    with _OUT_LOCK:
+        _OUT_BUF.extend(line)
+        full = len(_OUT_BUF) >= OUT_FLUSH_BYTES
+    if full:
+        flush_events()
+
+
+def emit_with_tail(event: Dict[str, Any], tail: bytes) -> None:
+    """
+    emit() for events whose trailing keys are constant across a batch:
+    tail holds them pre-serialized (',"k":v}\n') and replaces the event's
+    closing brace. Output is the same bytes emit() would write.
+    """
+    emit_bytes(dumps(event)[:-1] + tail)
+
+
+def flush_events() -> None:
+    with _OUT_LOCK:
+        if _OUT_BUF:
+            sys.stdout.buffer.write(_OUT_BUF)
+            _OUT_BUF.clear()
+        sys.stdout.buffer.flush()
+
+
+def parse_json(resp: requests.Response) -> Any:
+    if orjson is not None:
+        return orjson.loads(resp.content)
+    # Bytes in: skips requests' encoding guess and str decode
+    return json.loads(resp.content)
+
+
+def iter_items(resp: requests.Response, key: str) -> Iterator[Dict[str, Any]]:
+    # Requires stream=True on the request; memory stays at one record
+    if ijson is not None:
+        resp.raw.decode_content = True
+        return ijson.items(resp.raw, f"{key}.item", use_float=True)
+    return iter(parse_json(resp).get(key, []))
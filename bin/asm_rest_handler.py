@@ -17,15 +17,25 @@ Actions:
 - action=auth_test
 """
 
-import json
+import operator
 import time
-import ssl
 import socket
-import urllib.request
-from urllib.error import HTTPError, URLError
-
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import quote, unquote, urlsplit
+
+try:
+    # Optional: faster JSON parsing when orjson is available
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+import splunk
 import splunk.admin as admin
 import splunk.entity as entity
+import splunk.rest as rest
 
 APP_NAME = "Tenable_Attack_Surface_Management_for_Splunk"
 CONF_FILE = "asm_settings"
@@ -43,23 +53,76 @@ PROXY_TEST_URLS = [
 # NOTE: /api/1.0/inventory is not reliable. Use inventories/list (GET).
 AUTH_TEST_PATH = "/api/1.0/inventories/list"
 
+# Outbound test timeouts (seconds): fail fast on dead proxies,
+# stay tolerant of slow bodies
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 15
+
+# Redirects followed by proxy/auth test requests
+MAX_REDIRECTS = 3
+
+# TCP pre-flight to the proxy itself before any HTTP(S) probe
+PROXY_PREFLIGHT_TIMEOUT = 3
+
+# Input toggles are independent splunkd calls; cap concurrency
+MAX_TOGGLE_WORKERS = 8
+
+USER_AGENT = "Splunk-ASM/1.0"
+
+# Static headers, merged into every outbound test request
+_BASE_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "accept": "application/json",
+    # urllib3 sends no Accept-Encoding on its own; bodies are decoded on read
+    "Accept-Encoding": "gzip, deflate",
+}
+
+# DNS results are reused within this window (seconds)
+DNS_CACHE_TTL = 60
+
+# resp -> underlying SSL socket of a streamed urllib3 response
+_GET_SOCK = operator.attrgetter("connection.sock")
+
 
 # ------------------------------------------------------------
 # Utilities
 # ------------------------------------------------------------
 
 def _now_ms() -> int:
-    return int(time.time() * 1000)
+    # Monotonic clock: latency deltas can't go negative on NTP adjustments
+    return int(time.perf_counter() * 1000)
 
 
-def _write_conf(settings: dict) -> None:
-    entity.setEntity(
-        f"configs/conf-{CONF_FILE}",
-        CONF_STANZA,
-        settings,
-        namespace=APP_NAME,
-        owner="nobody",
-    )
+def _post_stanza(conf: str, stanza: str, settings: dict, session_key: str, create: bool = False) -> None:
+    """
+    Write every key=value pair of one conf stanza in a single POST.
+    With create=True a missing stanza is created (POST to the collection
+    with name=<stanza>) instead of failing with 404.
+    """
+    base = f"/servicesNS/nobody/{APP_NAME}/configs/conf-{conf}"
+    try:
+        rest.simpleRequest(
+            f"{base}/{quote(stanza, safe='')}",
+            sessionKey=session_key,
+            postargs=settings,
+            method="POST",
+            raiseAllErrors=True,
+        )
+    except splunk.ResourceNotFound:
+        if not create:
+            raise
+        rest.simpleRequest(
+            base,
+            sessionKey=session_key,
+            postargs={"name": stanza, **settings},
+            method="POST",
+            raiseAllErrors=True,
+        )
+
+
+def _write_conf(settings: dict, session_key: str) -> None:
+    # [settings] is not shipped in default/; the first save creates it
+    _post_stanza(CONF_FILE, CONF_STANZA, settings, session_key, create=True)
 
 
 def _read_conf() -> dict:
@@ -74,26 +137,73 @@ def _read_conf() -> dict:
         return {}
 
 
-def _build_proxy_handler(proxy: str):
-    if not proxy:
-        return None
-    return urllib.request.ProxyHandler({"http": proxy, "https": proxy})
+def _proxy_with_scheme(proxy: str) -> str:
+    # urllib's ProxyHandler accepted bare host:port; urllib3 needs a scheme
+    return proxy if "://" in proxy else f"http://{proxy}"
 
 
-def _open_url(url: str, headers: dict = None, proxy: str = None, timeout: int = 15):
-    handlers = []
-    ph = _build_proxy_handler(proxy)
-    if ph:
-        handlers.append(ph)
-
-    opener = urllib.request.build_opener(*handlers)
-    req = urllib.request.Request(url, headers=headers or {})
-    return opener.open(req, timeout=timeout)
+def _pool_for(proxy: str = None):
+    """
+    Return the shared urllib3 pool manager for this proxy (None = direct).
+    Pooled connections let repeated auth/proxy tests skip the TCP + TLS handshake.
+    """
+    return _manager_for(proxy or "")
+
+
+@lru_cache(maxsize=4)
+def _manager_for(key: str):
+    # Keyed on the proxy string ("" = direct); bounded so an admin trying
+    # several proxy URLs doesn't pin a pool per attempt in the handler process.
+    # urllib3 is imported lazily: the save action never needs it.
+    import urllib3
+
+    # No retries (a test should report the first failure), but follow up
+    # to 3 redirects as urllib did; retries=False would disable those too
+    kwargs = {
+        "num_pools": 4,
+        "maxsize": 4,
+        "retries": urllib3.Retry(total=MAX_REDIRECTS, connect=0, read=0, status=0, redirect=MAX_REDIRECTS),
+    }
+    try:
+        # Same CA bundle requests would use, when available
+        import certifi
+        kwargs["ca_certs"] = certifi.where()
+    except ImportError:
+        pass
+
+    if key:
+        proxy_url = _proxy_with_scheme(key)
+        parts = urlsplit(proxy_url)
+        if parts.username:
+            kwargs["proxy_headers"] = urllib3.make_headers(
+                proxy_basic_auth=f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+            )
+        return urllib3.ProxyManager(proxy_url, **kwargs)
+    return urllib3.PoolManager(**kwargs)
+
+
+def _open_url(
+    url: str,
+    headers: dict = None,
+    proxy: str = None,
+    connect_timeout: float = CONNECT_TIMEOUT,
+    read_timeout: float = READ_TIMEOUT,
+):
+    import urllib3
+
+    # Body is streamed (preload_content=False); callers read/drain it.
+    return _pool_for(proxy).request(
+        "GET",
+        url,
+        headers={**_BASE_HEADERS, **(headers or {})},
+        timeout=urllib3.Timeout(connect=connect_timeout, read=read_timeout),
+        preload_content=False,
+    )
 
 
 def _safe_read_body(resp, max_bytes: int = 4096) -> str:
     try:
-        data = resp.read(max_bytes)
+        data = resp.read(max_bytes, decode_content=True)
         if isinstance(data, bytes):
             return data.decode("utf-8", errors="ignore")
         return str(data)
@@ -101,29 +211,74 @@ def _safe_read_body(resp, max_bytes: int = 4096) -> str:
         return ""
 
 
+@lru_cache(maxsize=32)
+def _resolve(hostname: str, port: int, bucket: int) -> tuple:
+    # getaddrinfo like create_connection (IPv4 and IPv6), in its order;
+    # bucket changes every DNS_CACHE_TTL seconds, expiring old entries
+    infos = socket.getaddrinfo(hostname, port, type=socket.SOCK_STREAM)
+    return tuple(dict.fromkeys(info[4][0] for info in infos))
+
+
+def _connect(hostname: str, port: int, timeout: int) -> socket.socket:
+    """create_connection over the cached addresses, first reachable wins."""
+    error = None
+    for addr in _resolve(hostname, port, int(time.time() // DNS_CACHE_TTL)):
+        try:
+            return socket.create_connection((addr, port), timeout=timeout)
+        except OSError as e:
+            error = e
+    raise error or OSError(f"no addresses for {hostname}")
+
+
+def _release(resp) -> None:
+    """
+    Best-effort: discard any unread body so urllib3 returns the connection
+    to the pool instead of closing it when the response is closed.
+    """
+    try:
+        resp.drain_conn()
+    except Exception:
+        pass
+
+
+def _tls_info(ssock) -> tuple:
+    # (tls_version, cipher_name) from a connected SSL socket
+    cipher = ssock.cipher()
+    return ssock.version(), cipher[0] if cipher else None
+
+
+@lru_cache(maxsize=1)
+def _tls_context():
+    # Built once: loading the CA bundle is the expensive part. ssl stays lazy.
+    import ssl
+
+    return ssl.create_default_context()
+
+
 def _tls_probe(hostname: str, port: int = 443, proxy: str = None, timeout: int = 10) -> dict:
     """
     Best-effort TLS info probe.
-    - If proxy is provided (HTTP proxy), urllib handles CONNECT and we can’t reliably introspect here,
+    - If proxy is provided (HTTP proxy), urllib3 handles CONNECT and we can’t reliably introspect here,
       so return proxy-aware message.
     - Without proxy, do a direct TLS handshake to capture TLS version + cipher.
     """
     if proxy:
         return {
             "mode": "proxy",
-            "note": "TLS inspection skipped for proxy path (CONNECT handled by proxy/urllib)."
+            "note": "TLS inspection skipped for proxy path (CONNECT handled by proxy/urllib3)."
         }
 
-    ctx = ssl.create_default_context()
+    ctx = _tls_context()
     start = _now_ms()
     try:
-        with socket.create_connection((hostname, port), timeout=timeout) as sock:
+        with _connect(hostname, port, timeout) as sock:
             with ctx.wrap_socket(sock, server_hostname=hostname) as ssock:
                 latency_ms = _now_ms() - start
+                version, cipher = _tls_info(ssock)
                 return {
                     "mode": "direct",
-                    "tls_version": ssock.version(),
-                    "cipher": ssock.cipher()[0] if ssock.cipher() else None,
+                    "tls_version": version,
+                    "cipher": cipher,
                     "latency_ms": latency_ms,
                 }
     except Exception as e:
@@ -135,86 +290,154 @@ def _tls_probe(hostname: str, port: int = 443, proxy: str = None, timeout: int =
         }
 
 
+def _tls_from_resp(resp, proxy: str = None):
+    """
+    TLS details from the connection that served resp (no second handshake).
+    Must run before the body is drained, while the socket is still attached.
+    Returns None when the socket can't be reached.
+    """
+    try:
+        version, cipher = _tls_info(_GET_SOCK(resp))
+    except Exception:
+        return None
+
+    if not version:
+        return None
+
+    return {
+        "mode": "proxy" if proxy else "direct",
+        "tls_version": version,
+        "cipher": cipher,
+    }
+
+
+def _normalize_api_key(api_key: str) -> str:
+    """
+    ASM expects the raw token in the Authorization header (no scheme).
+    Strip whitespace and any pasted "Bearer " prefix once, at the edge.
+    """
+    api_key = (api_key or "").strip()
+    if api_key[:7].lower() == "bearer ":
+        api_key = api_key[7:].strip()
+    return api_key
+
+
 def _normalize_url(url: str) -> str:
     return url.strip()
 
 
 def _extract_hostname(url: str) -> str:
-    # Minimal parse (avoid extra deps)
-    u = url.replace("https://", "").replace("http://", "")
-    return u.split("/")[0].split(":")[0]
+    # urlsplit handles ports, userinfo and bracketed IPv6 hosts
+    return urlsplit(url).hostname or ""
 
 
 # ------------------------------------------------------------
 # Tests
 # ------------------------------------------------------------
 
-def test_proxy(proxy_url: str) -> list:
-    """
-    Proxy test:
-      - For each target URL: measure HTTP status + latency
-      - Add TLS probe details (direct only; proxy path returns note)
-    """
-    results = []
-    proxy_url = (proxy_url or "").strip()
-
-    for url in PROXY_TEST_URLS:
-        url = _normalize_url(url)
-        start = _now_ms()
+@dataclass
+class ProxyTestRecord:
+    """Per-target proxy test result (serialized with asdict)."""
+    url: str
+    proxy: str = ""
+    status: str = "unknown"
+    http_status: Optional[int] = None
+    latency_ms: Optional[int] = None
+    tls: dict = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+def _probe(url: str, proxy_url: str, tls_details: bool) -> dict:
+    """Run one proxy test target and return its result dict."""
+    url = _normalize_url(url)
+    start = _now_ms()
 
-        record = {
-            "url": url,
-            "proxy": proxy_url if proxy_url else "",
-            "status": "unknown",
-            "http_status": None,
-            "latency_ms": None,
-            "tls": {},
-            "error": None,
-        }
+    record = ProxyTestRecord(url=url, proxy=proxy_url)
 
-        try:
-            resp = _open_url(url, proxy=proxy_url if proxy_url else None, timeout=15)
+    try:
+        with _open_url(url, proxy=proxy_url if proxy_url else None) as resp:
             latency = _now_ms() - start
 
-            record["status"] = "success"
-            record["http_status"] = getattr(resp, "status", None)
-            record["latency_ms"] = latency
+            record.http_status = resp.status
+            record.latency_ms = latency
 
-            # TLS probe (best-effort)
-            host = _extract_hostname(url)
-            record["tls"] = _tls_probe(host, proxy=proxy_url if proxy_url else None)
+            # TLS details (best-effort, opt-in): reuse the live connection,
+            # fall back to a separate probe only if it can't be inspected
+            if tls_details:
+                record.tls = _tls_from_resp(resp, proxy=proxy_url) or _tls_probe(
+                    _extract_hostname(url), proxy=proxy_url if proxy_url else None
+                )
 
-            # Drain small body to avoid open handles (best-effort)
-            _safe_read_body(resp, max_bytes=512)
+            if resp.status >= 400:
+                record.status = "failure"
+                record.error = _safe_read_body(resp, max_bytes=1024)
+            else:
+                record.status = "success"
 
-        except HTTPError as e:
-            latency = _now_ms() - start
-            record["status"] = "failure"
-            record["http_status"] = e.code
-            record["latency_ms"] = latency
-            record["error"] = e.read().decode("utf-8", errors="ignore")[:1024]
-            host = _extract_hostname(url)
-            record["tls"] = _tls_probe(host, proxy=proxy_url if proxy_url else None)
+            # Drain the body so the connection goes back to the pool
+            _release(resp)
 
-        except URLError as e:
-            latency = _now_ms() - start
-            record["status"] = "failure"
-            record["latency_ms"] = latency
-            record["error"] = str(e.reason) if hasattr(e, "reason") else str(e)
+    except Exception as e:
+        latency = _now_ms() - start
+        record.status = "failure"
+        record.latency_ms = latency
+        record.error = str(e)
+        if tls_details:
             host = _extract_hostname(url)
-            record["tls"] = _tls_probe(host, proxy=proxy_url if proxy_url else None)
+            record.tls = _tls_probe(host, proxy=proxy_url if proxy_url else None)
 
-        except Exception as e:
-            latency = _now_ms() - start
-            record["status"] = "failure"
-            record["latency_ms"] = latency
-            record["error"] = str(e)
-            host = _extract_hostname(url)
-            record["tls"] = _tls_probe(host, proxy=proxy_url if proxy_url else None)
+    return asdict(record)
 
-        results.append(record)
 
-    return results
+def _proxy_preflight(proxy_url: str) -> str:
+    """
+    Plain TCP connect to the proxy host/port.
+    Returns None when reachable, otherwise an error string.
+    """
+    try:
+        parts = urlsplit(_proxy_with_scheme(proxy_url))
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        if not parts.hostname:
+            return "proxy TCP unreachable: invalid proxy URL"
+        with socket.create_connection((parts.hostname, port), timeout=PROXY_PREFLIGHT_TIMEOUT):
+            return None
+    except (OSError, ValueError) as e:
+        return f"proxy TCP unreachable: {e}"
+
+
+def test_proxy(proxy_url: str, tls_details: bool = False) -> list:
+    """
+    Proxy test:
+      - When a proxy is set, TCP pre-flight it first; if unreachable, every
+        target fails immediately without an HTTP(S) attempt
+      - Probe every target URL concurrently (wall time ~ slowest target)
+      - For each target URL: measure HTTP status + latency
+      - Optionally add TLS probe details (direct only; proxy path returns note)
+    Results keep PROXY_TEST_URLS order.
+    """
+    proxy_url = (proxy_url or "").strip()
+
+    if proxy_url:
+        start = _now_ms()
+        error = _proxy_preflight(proxy_url)
+        if error:
+            latency = _now_ms() - start
+            return [
+                asdict(ProxyTestRecord(
+                    url=_normalize_url(url),
+                    proxy=proxy_url,
+                    status="failure",
+                    latency_ms=latency,
+                    error=error,
+                ))
+                for url in PROXY_TEST_URLS
+            ]
+
+    with ThreadPoolExecutor(max_workers=len(PROXY_TEST_URLS)) as pool:
+        return list(pool.map(
+            lambda url: _probe(url, proxy_url, tls_details),
+            PROXY_TEST_URLS,
+        ))
 
 
 def test_auth(api_key: str, proxy: str = None) -> dict:
@@ -222,40 +445,38 @@ def test_auth(api_key: str, proxy: str = None) -> dict:
     Auth test:
       - Calls a stable authenticated endpoint.
       - Returns HTTP status and small response snippet for diagnostics.
+      - Expects api_key already normalized (see _normalize_api_key).
     """
-    api_key = (api_key or "").strip()
-    proxy = (proxy or "").strip()
 
-    headers = {
-        "accept": "application/json",
-        "Authorization": api_key,
-    }
+    # accept/User-Agent are merged in by _open_url; only the key is per call
+    headers = {"Authorization": api_key}
 
     url = f"{ASM_BASE_URL}{AUTH_TEST_PATH}"
 
     start = _now_ms()
     try:
-        resp = _open_url(url, headers=headers, proxy=proxy if proxy else None, timeout=20)
-        latency_ms = _now_ms() - start
-        body_snip = _safe_read_body(resp, max_bytes=1024)
-
-        return {
-            "status": "success",
-            "url": url,
-            "http_status": getattr(resp, "status", None),
-            "latency_ms": latency_ms,
-            "response_snippet": body_snip,
-        }
+        with _open_url(url, headers=headers, proxy=proxy if proxy else None) as resp:
+            latency_ms = _now_ms() - start
+
+            if resp.status >= 400:
+                result = {
+                    "status": "failure",
+                    "url": url,
+                    "http_status": resp.status,
+                    "latency_ms": latency_ms,
+                    "error": _safe_read_body(resp, max_bytes=4096),
+                }
+            else:
+                result = {
+                    "status": "success",
+                    "url": url,
+                    "http_status": resp.status,
+                    "latency_ms": latency_ms,
+                    "response_snippet": _safe_read_body(resp, max_bytes=1024),
+                }
 
-    except HTTPError as e:
-        latency_ms = _now_ms() - start
-        return {
-            "status": "failure",
-            "url": url,
-            "http_status": e.code,
-            "latency_ms": latency_ms,
-            "error": e.read().decode("utf-8", errors="ignore")[:4096],
-        }
+            _release(resp)
+            return result
 
     except Exception as e:
         latency_ms = _now_ms() - start
@@ -267,15 +488,10 @@ def test_auth(api_key: str, proxy: str = None) -> dict:
         }
 
 
-def set_input_state(script_name: str, enabled: bool) -> None:
+def set_input_state(script_name: str, enabled: bool, session_key: str) -> None:
+    # Only toggles stanzas shipped in default/inputs.conf; never creates one
     stanza = f"script://./bin/{script_name}"
-    entity.setEntity(
-        "configs/conf-inputs",
-        stanza,
-        {"disabled": "0" if enabled else "1"},
-        namespace=APP_NAME,
-        owner="nobody",
-    )
+    _post_stanza("inputs", stanza, {"disabled": "0" if enabled else "1"}, session_key)
 
 
 # ------------------------------------------------------------
@@ -283,26 +499,29 @@ def set_input_state(script_name: str, enabled: bool) -> None:
 # ------------------------------------------------------------
 
 class ASMRestHandler(admin.MConfigHandler):
+    # action -> handler method name
+    _ACTIONS = {
+        "save": "_handle_save",
+        "proxy_test": "_handle_proxy_test",
+        "auth_test": "_handle_auth_test",
+    }
+
     def setup(self):
-        for arg in ["action", "api_key", "proxy", "index", "inputs"]:
+        for arg in ["action", "api_key", "proxy", "index", "inputs", "tls_details"]:
             self.supportedArgs.addOptArg(arg)
 
     def handle(self):
         action = self.callerArgs.get("action", [""])[0].strip()
 
-        if action == "save":
-            self._handle_save()
-        elif action == "proxy_test":
-            self._handle_proxy_test()
-        elif action == "auth_test":
-            self._handle_auth_test()
-        else:
+        method = self._ACTIONS.get(action)
+        if method is None:
             raise admin.ArgValidationException("Invalid action")
+        getattr(self, method)()
 
     # --------------------------------------------------------
 
     def _handle_save(self):
-        api_key = self.callerArgs.get("api_key", [""])[0].strip()
+        api_key = _normalize_api_key(self.callerArgs.get("api_key", [""])[0])
         proxy = self.callerArgs.get("proxy", [""])[0].strip()
         index = self.callerArgs.get("index", [""])[0].strip()
         inputs_raw = self.callerArgs.get("inputs", ["{}"])[0].strip()
@@ -314,7 +533,7 @@ class ASMRestHandler(admin.MConfigHandler):
             raise admin.ArgValidationException("Missing index")
 
         try:
-            inputs = json.loads(inputs_raw) if inputs_raw else {}
+            inputs = _json_loads(inputs_raw) if inputs_raw else {}
             if not isinstance(inputs, dict):
                 raise ValueError("inputs must be a JSON object")
         except Exception:
@@ -328,11 +547,17 @@ class ASMRestHandler(admin.MConfigHandler):
             "last_updated": str(int(time.time())),
         }
 
-        _write_conf(settings)
+        session_key = self.getSessionKey()
+        _write_conf(settings, session_key)
 
-        # Toggle modular inputs
-        for script, enabled in inputs.items():
-            set_input_state(str(script), bool(enabled))
+        # Toggle modular inputs (concurrently; list() surfaces any failure)
+        if inputs:
+            workers = min(len(inputs), MAX_TOGGLE_WORKERS)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(
+                    lambda item: set_input_state(str(item[0]), bool(item[1]), session_key),
+                    inputs.items(),
+                ))
 
         self.writeResponse({
             "status": "success",
@@ -343,7 +568,8 @@ class ASMRestHandler(admin.MConfigHandler):
 
     def _handle_proxy_test(self):
         proxy = self.callerArgs.get("proxy", [""])[0].strip()
-        result = test_proxy(proxy)
+        tls_details = self.callerArgs.get("tls_details", [""])[0].strip().lower() in ("1", "true")
+        result = test_proxy(proxy, tls_details=tls_details)
         self.writeResponse({
             "status": "ok",
             "results": result,
@@ -352,7 +578,7 @@ class ASMRestHandler(admin.MConfigHandler):
     # --------------------------------------------------------
 
     def _handle_auth_test(self):
-        api_key = self.callerArgs.get("api_key", [""])[0].strip()
+        api_key = _normalize_api_key(self.callerArgs.get("api_key", [""])[0])
         proxy = self.callerArgs.get("proxy", [""])[0].strip()
 
         if not api_key:
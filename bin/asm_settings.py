@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# bin/asm_settings.py
+#
+# Tenable Attack Surface Management – shared settings loader
+#
+# Settings are read from splunkd (getEntity) and cached on disk, keyed on
+# the asm_settings.conf mtimes, so warm runs skip the REST round-trip.
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import splunk.entity as entity
+
+APP_NAME = "Tenable_Attack_Surface_Management_for_Splunk"
+CONF_FILE = "asm_settings"
+CONF_STANZA = "settings"
+
+CACHE_FILE = "asm_settings_cache.json"
+
+# In-process copy for the combined collector: (mtimes, settings)
+_MEMO: Tuple[Optional[List[Optional[float]]], Optional[Dict[str, Any]]] = (None, None)
+
+
+def app_root() -> str:
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def conf_mtimes() -> List[Optional[float]]:
+    root = app_root()
+    return [
+        _mtime(os.path.join(root, "local", f"{CONF_FILE}.conf")),
+        _mtime(os.path.join(root, "default", f"{CONF_FILE}.conf")),
+    ]
+
+
+def cache_path() -> Optional[str]:
+    home = os.environ.get("SPLUNK_HOME")
+    if not home:
+        return None
+    return os.path.join(home, "var", "run", CACHE_FILE)
+
+
+def _read_cache(path: str, key: List[Optional[float]]) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved.get("mtimes") == key:
+            return saved.get("settings")
+    except Exception:
+        pass
+    return None
+
+
+def _write_cache(path: str, key: List[Optional[float]], settings: Dict[str, Any]) -> None:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        # Holds the API key: owner-only, like local/asm_settings.conf (see README)
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, "w", encoding="utf-8") as f:
+            json.dump({"mtimes": key, "settings": settings}, f, default=str)
+        os.replace(tmp, path)
+    except Exception:
+        # Cache is an optimization; never fail the run over it
+        pass
+
+
+def load_settings() -> Dict[str, Any]:
+    global _MEMO
+    key = conf_mtimes()
+
+    # Several collectors in one process (tenable_asm_all) share one load
+    memo_key, memo = _MEMO
+    if memo is not None and memo_key == key:
+        return memo
+
+    path = cache_path()
+
+    if path:
+        cached = _read_cache(path, key)
+        if cached is not None:
+            _MEMO = (key, cached)
+            return cached
+
+    conf = entity.getEntity(
+        f"configs/conf-{CONF_FILE}",
+        CONF_STANZA,
+        namespace=APP_NAME,
+        owner="nobody",
+    )
+    # Drop splunkd's eai:* metadata; only the stanza's keys are cached
+    settings = {k: v for k, v in conf.items() if not k.startswith("eai:")}
+
+    if path:
+        _write_cache(path, key, settings)
+    _MEMO = (key, settings)
+    return settings
+
+
+def get_str(cfg: Dict[str, Any], key: str, default: str = "") -> str:
+    val = cfg.get(key)
+    return str(val).strip() if val is not None else default
+
+
+def get_int(cfg: Dict[str, Any], key: str, default: int) -> int:
+    try:
+        return int(cfg.get(key, default))
+    except Exception:
+        return default
@@ -10,43 +10,95 @@ Endpoint: GET https://asm.cloud.tenable.com/api/1.0/admin/users
 COMBAT / RESILIENT BEHAVIOR
 - Strict stdout discipline: JSON events only
 - Proxy support (scheme/host/port/auth)
-- Retries with exponential backoff + jitter
+- Retries with exponential backoff (urllib3 Retry on the session adapter)
+- Offset/limit paging, remaining pages fetched concurrently
 - 429 handling with Retry-After
 - Connect + read timeout discipline
 - Full-fidelity record emission
 - Telemetry + normalized error events
+- Circuit breaker: skip runs while ASM keeps failing (state in $SPLUNK_HOME)
 """
 
+import functools
 import json
 import os
-import random
 import sys
 import time
-from configparser import ConfigParser
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from asm_emit import dumps, emit, emit_bytes, flush_events, parse_json
+from asm_http import iter_pages
 
 APP_NAME = "Tenable_Attack_Surface_Management_for_Splunk"
 ASM_URL = "https://asm.cloud.tenable.com/api/1.0/admin/users"
 
+_STATIC_HEADERS = {
+    "accept": "application/json",
+    # requests' default, pinned: admin user pages compress 5-10x
+    "Accept-Encoding": "gzip, deflate",
+}
+
 # Retry policy
 MAX_ATTEMPTS = 6
 BASE_BACKOFF = 1.0
 MAX_BACKOFF = 30.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Terminal status dispatch (one dict lookup per response)
+RETRIES_EXHAUSTED = "retries_exhausted"
+CLIENT_ERROR = "client_error"
+
+_STATUS_ACTION = {
+    **{code: RETRIES_EXHAUSTED for code in RETRY_STATUSES},
+    **{code: CLIENT_ERROR for code in (400, 401, 403, 404)},
+}
 
 # Timeouts
 CONNECT_TIMEOUT = 10
 READ_TIMEOUT = 60
 
+# Connection pool (keep-alive across retries / requests in this process)
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 8
+
+# Pagination (remaining pages fetched concurrently once total is known)
+PAGE_LIMIT = 100
+MAX_PAGE_WORKERS = 4
+
+# Circuit breaker (fail fast across runs while ASM is down)
+BREAKER_FILE = "asm_breaker.json"
+BREAKER_BASE_SECONDS = 30
+BREAKER_MAX_SECONDS = 300
+
+_SESSION: Optional[requests.Session] = None
+
+# Parsed settings keyed on (local_mtime, default_mtime)
+_SETTINGS_CACHE: Dict[Tuple[Optional[float], ...], Tuple[str, Optional[Dict[str, str]]]] = {}
+
+# Event ts is re-read once per this many user records
+TS_REFRESH_EVERY = 1000
+
+_USER_EVENT_PREFIX = b'{"event_type":"asm_admin_user","ts":'
+
 
 # ------------------------------------------------------------
 # Utilities
 # ------------------------------------------------------------
 
-def emit(event: Dict[str, Any]) -> None:
-    print(json.dumps(event, ensure_ascii=False))
+def user_event_head(ts: int) -> bytes:
+    # Everything before the record; rebuilt only when the batch ts changes
+    return b'%s%d,"record":' % (_USER_EVENT_PREFIX, ts)
+
+
+def emit_user(head: bytes, user: Dict[str, Any]) -> None:
+    # Same bytes as emit({"event_type", "ts", "record"}), but the constant
+    # head is pre-serialized; only the record is encoded per event
+    emit_bytes(head + dumps(user) + b"}\n")
 
 
 def utc_epoch() -> int:
@@ -57,24 +109,90 @@ def app_root() -> str:
     return os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 
 
+def get_session() -> requests.Session:
+    global _SESSION
+    if _SESSION is None:
+        sess = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=POOL_CONNECTIONS,
+            pool_maxsize=POOL_MAXSIZE,
+            max_retries=retry_policy(),
+        )
+        sess.mount("https://", adapter)
+        sess.mount("http://", adapter)
+        _SESSION = sess
+    return _SESSION
+
+
 # ------------------------------------------------------------
 # Settings
 # ------------------------------------------------------------
 
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
 def load_settings() -> Tuple[str, Optional[Dict[str, str]]]:
     root = app_root()
-    cp = ConfigParser()
-
-    if not cp.read([
+    paths = [
         f"{root}/local/asm_settings.conf",
         f"{root}/default/asm_settings.conf",
-    ]):
+    ]
+
+    # Re-parse only when either conf file changed
+    key = tuple(_mtime(p) for p in paths)
+    cached = _SETTINGS_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    settings = _parse_settings(paths)
+    _SETTINGS_CACHE.clear()
+    _SETTINGS_CACHE[key] = settings
+    return settings
+
+
+def _read_kv(path: str) -> Optional[Dict[str, Dict[str, str]]]:
+    """
+    Minimal single-pass .conf reader: {stanza: {key: value}}.
+    Returns None when the file can't be read.
+    """
+    try:
+        f = open(path, encoding="utf-8")
+    except OSError:
+        return None
+
+    stanzas: Dict[str, Dict[str, str]] = {}
+    current = None
+
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line or line[0] in "#;":
+                continue
+            if line[0] == "[" and line[-1] == "]":
+                current = stanzas.setdefault(line[1:-1].strip(), {})
+            elif current is not None and "=" in line:
+                key, value = line.split("=", 1)
+                current[key.strip()] = value.strip()
+
+    return stanzas
+
+
+def _parse_settings(paths: List[str]) -> Tuple[str, Optional[Dict[str, str]]]:
+    # paths are in precedence order (local first); merge default -> local
+    confs = [c for c in (_read_kv(p) for p in reversed(paths)) if c is not None]
+    if not confs:
         raise RuntimeError("asm_settings.conf not found")
 
-    if "global" not in cp:
+    if not any("global" in c for c in confs):
         raise RuntimeError("Missing [global] stanza in asm_settings.conf")
 
-    g = cp["global"]
+    g: Dict[str, str] = {}
+    for c in confs:
+        g.update(c.get("global", {}))
 
     api_key = (g.get("asm_api_key") or "").strip()
     if not api_key:
@@ -101,90 +219,187 @@ def load_settings() -> Tuple[str, Optional[Dict[str, str]]]:
 
 
 # ------------------------------------------------------------
-# Backoff
+# Retry policy (handled inside the session adapter)
 # ------------------------------------------------------------
 
-def sleep_backoff(attempt: int, retry_after: Optional[float] = None) -> None:
-    if retry_after is not None:
-        delay = min(float(retry_after), MAX_BACKOFF)
-        time.sleep(delay + random.uniform(0, 0.5))
-        return
+class _CappedRetry(Retry):
+    # Honor Retry-After, but never wait longer than MAX_BACKOFF
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return min(retry_after, MAX_BACKOFF) if retry_after is not None else None
+
+
+def retry_policy() -> Retry:
+    return _CappedRetry(
+        total=MAX_ATTEMPTS - 1,
+        backoff_factor=BASE_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
 
-    delay = min(BASE_BACKOFF * (2 ** (attempt - 1)), MAX_BACKOFF)
-    time.sleep(delay + random.uniform(0, 0.75))
+
+# ------------------------------------------------------------
+# Circuit breaker
+# ------------------------------------------------------------
+
+def breaker_path() -> Optional[str]:
+    home = os.environ.get("SPLUNK_HOME")
+    if not home:
+        return None
+    return os.path.join(home, "var", "lib", "splunk", "modinputs", BREAKER_FILE)
 
 
-def retry_after(resp: requests.Response) -> Optional[float]:
-    ra = resp.headers.get("Retry-After")
+def load_breaker(host: str) -> Dict[str, Any]:
+    state = {"host": host, "state": "closed", "open_until_ts": 0, "failure_count": 0}
+    path = breaker_path()
+    if not path:
+        return state
     try:
-        return float(ra) if ra else None
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved.get("host") == host:
+            state.update(saved)
     except Exception:
-        return None
+        pass
+    return state
+
+
+def save_breaker(state: Dict[str, Any]) -> None:
+    path = breaker_path()
+    if not path:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+    except Exception:
+        # Breaker is an optimization; never fail the run over it
+        pass
+
+
+def breaker_trip(state: Dict[str, Any]) -> None:
+    # Open for an exponentially growing window, capped
+    state["failure_count"] = int(state.get("failure_count", 0)) + 1
+    window = min(BREAKER_BASE_SECONDS * (2 ** (state["failure_count"] - 1)), BREAKER_MAX_SECONDS)
+    state["state"] = "open"
+    state["open_until_ts"] = utc_epoch() + window
+    save_breaker(state)
+
+
+def breaker_reset(state: Dict[str, Any]) -> None:
+    if state.get("failure_count") or state.get("state") != "closed":
+        state.update({"state": "closed", "open_until_ts": 0, "failure_count": 0})
+        save_breaker(state)
 
 
 # ------------------------------------------------------------
 # Fetch
 # ------------------------------------------------------------
 
-def fetch_users(api_key: str, proxies: Optional[Dict[str, str]]) -> Dict[str, Any]:
-    headers = {
-        "accept": "application/json",
-        "Authorization": api_key,  # raw token, as required
-    }
+class ASMUnavailable(RuntimeError):
+    """ASM unreachable or still failing after retries (trips the breaker)."""
 
-    sess = requests.Session()
-    if proxies:
-        sess.proxies.update(proxies)
 
-    start = time.time()
-    last_status = None
-    last_error = None
+def fetch_page(
+    sess: requests.Session,
+    proxies: Optional[Dict[str, str]],
+    offset: int,
+) -> Tuple[int, int, Dict[str, Any]]:
+    """
+    GET one page of admin users.
+    429 (Retry-After), 5xx and connection errors are retried by the adapter.
+    Returns (http_status, attempts, payload).
+    """
+    try:
+        resp = sess.get(
+            ASM_URL,
+            params={"offset": offset, "limit": PAGE_LIMIT},
+            proxies=proxies,
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+        )
+    except requests.RequestException as e:
+        raise ASMUnavailable(
+            f"Failed after {MAX_ATTEMPTS} attempts (offset={offset}, error={e})"
+        )
 
-    for attempt in range(1, MAX_ATTEMPTS + 1):
-        try:
-            resp = sess.get(
-                ASM_URL,
-                headers=headers,
-                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
-            )
+    retries = getattr(resp.raw, "retries", None)
+    attempts = len(retries.history) + 1 if retries is not None else 1
 
-            last_status = resp.status_code
+    action = _STATUS_ACTION.get(resp.status_code)
 
-            if resp.status_code == 429:
-                sleep_backoff(attempt, retry_after(resp))
-                continue
+    if action == RETRIES_EXHAUSTED:
+        raise ASMUnavailable(
+            f"Failed after {attempts} attempts "
+            f"(offset={offset}, last_status={resp.status_code})"
+        )
 
-            if resp.status_code in (500, 502, 503, 504):
-                sleep_backoff(attempt)
-                continue
+    if action == CLIENT_ERROR:
+        raise RuntimeError(f"HTTP {resp.status_code}: {resp.text[:2000]}")
 
-            if resp.status_code in (400, 401, 403, 404):
-                raise RuntimeError(f"HTTP {resp.status_code}: {resp.text[:2000]}")
+    resp.raise_for_status()
 
-            resp.raise_for_status()
+    payload = parse_json(resp)
 
-            payload = resp.json()
-            users = payload.get("list")
+    if not isinstance(payload.get("list"), list):
+        raise RuntimeError("Invalid payload: missing list[]")
 
-            if not isinstance(users, list):
-                raise RuntimeError("Invalid payload: missing list[]")
+    return resp.status_code, attempts, payload
 
-            return {
-                "http_status": resp.status_code,
-                "latency_ms": int((time.time() - start) * 1000),
-                "attempts": attempt,
-                "users": users,
-                "total": payload.get("total", len(users)),
-            }
 
-        except Exception as e:
-            last_error = e
-            sleep_backoff(attempt)
+def iter_users(
+    api_key: str,
+    proxies: Optional[Dict[str, str]],
+    stats: Dict[str, Any],
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield admin user records page by page, so at most MAX_PAGE_WORKERS
+    pages are held in memory instead of the whole tenant.
+    stats is filled with http_status/attempts/pages/total/latency_ms.
+    """
+    sess = get_session()
 
-    raise RuntimeError(
-        f"Failed after {MAX_ATTEMPTS} attempts "
-        f"(last_status={last_status}, error={last_error})"
-    )
+    # Set once on the session instead of merged into every page request
+    sess.headers.update(_STATIC_HEADERS)
+    sess.headers["Authorization"] = api_key  # raw token, as required
+
+    start = time.time()
+
+    # First page tells us the total
+    http_status, attempts, payload = fetch_page(sess, proxies, 0)
+    users = payload["list"]
+
+    total = payload.get("total")
+
+    stats.update({
+        "http_status": http_status,
+        "attempts": attempts,
+        "pages": 1,
+        "total": total if isinstance(total, int) else len(users),
+    })
+
+    yield from users
+
+    # Remaining pages over the pooled session (asm_http.iter_pages): one
+    # window of MAX_PAGE_WORKERS pages at a time when the total is known,
+    # otherwise serially until an empty or short page
+    for _, page_attempts, page in iter_pages(
+        functools.partial(fetch_page, sess, proxies),
+        lambda result: result[2]["list"],
+        (http_status, attempts, payload),
+        total,
+        MAX_PAGE_WORKERS,
+    ):
+        stats["attempts"] += page_attempts
+        stats["pages"] += 1
+        if not isinstance(total, int):
+            stats["total"] += len(page["list"])
+        yield from page["list"]
+
+    stats["latency_ms"] = int((time.time() - start) * 1000)
 
 
 # ------------------------------------------------------------
@@ -200,26 +415,53 @@ def main() -> None:
 
     try:
         api_key, proxies = load_settings()
-        result = fetch_users(api_key, proxies)
 
-        for user in result["users"]:
+        breaker = load_breaker(urlsplit(ASM_URL).hostname)
+        if utc_epoch() < breaker["open_until_ts"]:
             emit({
-                "event_type": "asm_admin_user",
+                "event_type": "asm_admin_users_skipped",
                 "ts": utc_epoch(),
-                "record": user,
+                "endpoint": ASM_URL,
+                "reason": "circuit_open",
+                "open_until_ts": breaker["open_until_ts"],
+                "failure_count": breaker["failure_count"],
             })
+            flush_events()
+            return
+
+        stats: Dict[str, Any] = {}
+        count = 0
+        head = user_event_head(utc_epoch())
+        _emit_user = emit_user
+
+        try:
+            for user in iter_users(api_key, proxies, stats):
+                # one clock read per TS_REFRESH_EVERY records, not per record
+                if count and count % TS_REFRESH_EVERY == 0:
+                    head = user_event_head(utc_epoch())
+                _emit_user(head, user)
+                count += 1
+        except ASMUnavailable:
+            # Only outages open the breaker; client errors (bad key, 404)
+            # and bad payloads surface on every run
+            breaker_trip(breaker)
+            raise
+
+        breaker_reset(breaker)
 
         emit({
             "event_type": "asm_admin_users_run_summary",
             "ts": utc_epoch(),
             "endpoint": ASM_URL,
-            "http_status": result["http_status"],
-            "attempts": result["attempts"],
-            "latency_ms": result["latency_ms"],
-            "records_retrieved": len(result["users"]),
-            "raw_total": result["total"],
+            "http_status": stats["http_status"],
+            "attempts": stats["attempts"],
+            "pages": stats["pages"],
+            "latency_ms": stats["latency_ms"],
+            "records_retrieved": count,
+            "raw_total": stats["total"],
             "proxy_used": bool(proxies),
         })
+        flush_events()
 
     except Exception as e:
         emit({
@@ -228,6 +470,7 @@ def main() -> None:
             "endpoint": ASM_URL,
             "error": str(e),
         })
+        flush_events()
         sys.exit(1)
 
 
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# bin/tenable_asm_all.py
+#
+# Tenable Attack Surface Management – combined collector
+# Usage: tenable_asm_all.py --endpoints limits,subscriptions,suggestions
+#
+# Runs several collectors in one interpreter so imports, the settings read
+# and the pooled HTTP session (asm_http) are shared instead of paid per
+# scripted input. Each collector emits its usual event_type unchanged, but
+# every event gets the sourcetype of the stanza running this script (see
+# default/inputs.conf): search on event_type, not the per-endpoint sourcetype.
+
+import argparse
+import importlib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from asm_emit import emit, flush_events
+from asm_settings import load_settings
+
+# endpoint name -> collector module (each exposes main()). Only collectors
+# that read [settings] through asm_settings; tenable_asm_admin_users parses
+# the [global] stanza itself and keeps its own scripted input.
+ENDPOINTS: Dict[str, str] = {
+    "inventories": "tenable_asm_inventories",
+    "limits": "tenable_asm_limits",
+    "subscriptions": "tenable_asm_subscriptions",
+    "suggestion_counts": "tenable_asm_suggestion_counts",
+    "suggestions": "tenable_asm_suggestions",
+    "txt_records": "tenable_asm_txt_records_search",
+    "user_actions": "tenable_asm_user_actions",
+    "users": "tenable_asm_users",
+}
+
+MAX_WORKERS = 4
+
+
+def run_endpoint(name: str) -> bool:
+    """Run one collector's main(); True on success."""
+    try:
+        module = importlib.import_module(ENDPOINTS[name])
+        module.main()
+        return True
+    except SystemExit as exc:
+        # Collectors exit(1) after emitting their own *_error event
+        return not exc.code
+    except Exception as exc:
+        # Import failures never reach the collector's own error handling;
+        # emitted via asm_emit so it cannot split other collectors' lines
+        emit({
+            "event_type": "asm_all_error",
+            "endpoint": name,
+            "error": str(exc),
+            "ts": int(time.time())
+        })
+        flush_events()
+        return False
+
+
+def parse_endpoints(argv: List[str]) -> List[str]:
+    parser = argparse.ArgumentParser(prog="tenable_asm_all.py")
+    parser.add_argument(
+        "--endpoints",
+        required=True,
+        help="comma-separated subset of: " + ", ".join(ENDPOINTS),
+    )
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.endpoints.split(",") if n.strip()]
+    unknown = [n for n in names if n not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoint(s): {', '.join(unknown)}")
+    return names
+
+
+def main() -> None:
+    names = parse_endpoints(sys.argv[1:])
+
+    # Warm the shared settings cache once before the collectors fan out
+    try:
+        load_settings()
+    except Exception:
+        pass
+
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(names)) or 1) as pool:
+        results = list(pool.map(run_endpoint, names))
+
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
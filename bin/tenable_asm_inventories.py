@@ -4,46 +4,16 @@
 # Tenable Attack Surface Management – Inventories
 # Endpoint: GET /api/1.0/inventories/list
 
-import json
 import sys
 import time
-from typing import Any, Dict
 
-import requests
-import splunk.entity as entity
-
-APP_NAME = "Tenable_Attack_Surface_Management_for_Splunk"
-CONF_FILE = "asm_settings"
-CONF_STANZA = "settings"
+from asm_emit import emit, flush_events, iter_items
+from asm_http import get_session
+from asm_settings import get_int, get_str, load_settings
 
 API_URL = "https://asm.cloud.tenable.com/api/1.0/inventories/list"
 
 
-def emit(event: Dict[str, Any]) -> None:
-    print(json.dumps(event, ensure_ascii=False))
-
-
-def load_settings() -> Dict[str, Any]:
-    return entity.getEntity(
-        f"configs/conf-{CONF_FILE}",
-        CONF_STANZA,
-        namespace=APP_NAME,
-        owner="nobody",
-    )
-
-
-def get_str(cfg: Dict[str, Any], key: str, default: str = "") -> str:
-    val = cfg.get(key)
-    return str(val).strip() if val is not None else default
-
-
-def get_int(cfg: Dict[str, Any], key: str, default: int) -> int:
-    try:
-        return int(cfg.get(key, default))
-    except Exception:
-        return default
-
-
 def main() -> None:
     now = int(time.time())
 
@@ -57,22 +27,12 @@ def main() -> None:
         proxy = get_str(cfg, "proxy")
         timeout = get_int(cfg, "timeout_seconds", 60)
 
-        headers = {
-            "accept": "application/json",
-            "Authorization": api_key,
-        }
+        session = get_session(api_key, proxy)
 
-        session = requests.Session()
-        if proxy:
-            session.proxies.update({"http": proxy, "https": proxy})
-
-        resp = session.get(API_URL, headers=headers, timeout=timeout)
+        resp = session.get(API_URL, timeout=timeout, stream=True)
         resp.raise_for_status()
 
-        payload = resp.json()
-        inventories = payload.get("list", [])
-
-        for inv in inventories:
+        for inv in iter_items(resp, "list"):
             emit({
                 "event_type": "asm_inventory",
                 "inventory_id": inv.get("inventory_id"),
@@ -87,6 +47,17 @@ def main() -> None:
                 "retrieved_at": now,
             })
 
+        flush_events()
+
     except Exception as exc:
         emit({
             "event_type": "asm_inventory_error",
+            "error": str(exc),
+            "ts": int(time.time())
+        })
+        flush_events()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
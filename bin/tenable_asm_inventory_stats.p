@@ -6,45 +6,16 @@
 #
 # Emits a single snapshot event with inventory counts & limits
 
-import json
 import sys
 import time
-import requests
-import splunk.entity as entity
-from typing import Dict, Any
 
-APP_NAME = "Tenable_Attack_Surface_Management_for_Splunk"
-CONF_FILE = "asm_settings"
-CONF_STANZA = "settings"
+from asm_emit import emit, flush_events, parse_json
+from asm_http import get_session
+from asm_settings import get_int, get_str, load_settings
 
 API_URL = "https://asm.cloud.tenable.com/api/1.0/inventory"
 
 
-def emit(event: Dict[str, Any]) -> None:
-    print(json.dumps(event, ensure_ascii=False))
-
-
-def load_settings() -> Dict[str, Any]:
-    return entity.getEntity(
-        f"configs/conf-{CONF_FILE}",
-        CONF_STANZA,
-        namespace=APP_NAME,
-        owner="nobody",
-    )
-
-
-def get_str(cfg: Dict[str, Any], key: str, default: str = "") -> str:
-    val = cfg.get(key)
-    return str(val).strip() if val is not None else default
-
-
-def get_int(cfg: Dict[str, Any], key: str, default: int) -> int:
-    try:
-        return int(cfg.get(key, default))
-    except Exception:
-        return default
-
-
 def main() -> None:
     try:
         cfg = load_settings()
@@ -56,25 +27,16 @@ def main() -> None:
         proxy = get_str(cfg, "proxy")
         timeout = get_int(cfg, "timeout_seconds", 60)
 
-        headers = {
-            "accept": "application/json",
-            "content-type": "application/json",
-            "Authorization": api_key
-        }
-
-        session = requests.Session()
-        if proxy:
-            session.proxies.update({"http": proxy, "https": proxy})
+        session = get_session(api_key, proxy)
 
         resp = session.post(
             API_URL,
-            headers=headers,
             json={},
             timeout=timeout
         )
         resp.raise_for_status()
 
-        data = resp.json()
+        data = parse_json(resp)
         stats = data.get("stats", {})
 
         emit({
@@ -89,12 +51,15 @@ def main() -> None:
             "retrieved_at": int(time.time())
         })
 
+        flush_events()
+
     except Exception as exc:
         emit({
             "event_type": "asm_inventory_stats_error",
             "error": str(exc),
             "ts": int(time.time())
         })
+        flush_events()
         sys.exit(1)
 
 
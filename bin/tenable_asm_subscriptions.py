@@ -4,45 +4,17 @@
 # Tenable Attack Surface Management – Subscriptions
 # Endpoint: GET /api/1.0/subscriptions
 
-import json
 import sys
 import time
-import requests
-import splunk.entity as entity
 from typing import Dict, Any, List
 
-APP_NAME = "Tenable_Attack_Surface_Management_for_Splunk"
-CONF_FILE = "asm_settings"
-CONF_STANZA = "settings"
+from asm_emit import emit, flush_events, parse_json
+from asm_http import get_session
+from asm_settings import get_int, get_str, load_settings
 
 API_URL = "https://asm.cloud.tenable.com/api/1.0/subscriptions"
 
 
-def emit(event: Dict[str, Any]) -> None:
-    print(json.dumps(event, ensure_ascii=False))
-
-
-def load_settings() -> Dict[str, Any]:
-    return entity.getEntity(
-        f"configs/conf-{CONF_FILE}",
-        CONF_STANZA,
-        namespace=APP_NAME,
-        owner="nobody",
-    )
-
-
-def get_str(cfg: Dict[str, Any], key: str, default: str = "") -> str:
-    val = cfg.get(key)
-    return str(val).strip() if val is not None else default
-
-
-def get_int(cfg: Dict[str, Any], key: str, default: int) -> int:
-    try:
-        return int(cfg.get(key, default))
-    except Exception:
-        return default
-
-
 def main() -> None:
     try:
         cfg = load_settings()
@@ -54,19 +26,12 @@ def main() -> None:
         proxy = get_str(cfg, "proxy")
         timeout = get_int(cfg, "timeout_seconds", 60)
 
-        headers = {
-            "accept": "application/json",
-            "Authorization": api_key
-        }
+        session = get_session(api_key, proxy)
 
-        session = requests.Session()
-        if proxy:
-            session.proxies.update({"http": proxy, "https": proxy})
-
-        resp = session.get(API_URL, headers=headers, timeout=timeout)
+        resp = session.get(API_URL, timeout=timeout)
         resp.raise_for_status()
 
-        payload = resp.json()
+        payload = parse_json(resp)
         subs: List[Dict[str, Any]] = payload.get("list", [])
 
         now = int(time.time())
@@ -78,12 +43,15 @@ def main() -> None:
                 **sub
             })
 
+        flush_events()
+
     except Exception as exc:
         emit({
             "event_type": "asm_subscription_error",
             "error": str(exc),
             "ts": int(time.time())
         })
+        flush_events()
         sys.exit(1)
 
 
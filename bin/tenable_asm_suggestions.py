@@ -5,48 +5,30 @@
 # Endpoint: POST /api/1.0/suggestions/list
 # Supports archived + non-archived suggestions
 
-import json
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
-import splunk.entity as entity
 from typing import Dict, Any, List
 
-APP_NAME = "Tenable_Attack_Surface_Management_for_Splunk"
-CONF_FILE = "asm_settings"
-CONF_STANZA = "settings"
+from asm_emit import emit, emit_with_tail, flush_events, parse_json
+from asm_http import get_session
+from asm_settings import get_int, get_str, load_settings
 
 API_URL = "https://asm.cloud.tenable.com/api/1.0/suggestions/list"
 
+ARCHIVED_FLAGS = (False, True)
 
-def emit(event: Dict[str, Any]) -> None:
-    print(json.dumps(event, ensure_ascii=False))
 
-
-def load_settings() -> Dict[str, Any]:
-    return entity.getEntity(
-        f"configs/conf-{CONF_FILE}",
-        CONF_STANZA,
-        namespace=APP_NAME,
-        owner="nobody",
+def suggestion_tail(is_archived: bool, retrieved_at: int) -> bytes:
+    return b',"is_archived":%s,"retrieved_at":%d}\n' % (
+        b"true" if is_archived else b"false",
+        retrieved_at,
     )
 
 
-def get_str(cfg: Dict[str, Any], key: str, default: str = "") -> str:
-    val = cfg.get(key)
-    return str(val).strip() if val is not None else default
-
-
-def get_int(cfg: Dict[str, Any], key: str, default: int) -> int:
-    try:
-        return int(cfg.get(key, default))
-    except Exception:
-        return default
-
-
 def fetch_suggestions(
     session: requests.Session,
-    headers: Dict[str, str],
     is_archived: bool,
     timeout: int
 ) -> List[Dict[str, Any]]:
@@ -55,9 +37,9 @@ def fetch_suggestions(
         "is_archived": is_archived
     }
 
-    resp = session.post(API_URL, headers=headers, json=payload, timeout=timeout)
+    resp = session.post(API_URL, json=payload, timeout=timeout)
     resp.raise_for_status()
-    data = resp.json()
+    data = parse_json(resp)
 
     return data.get("suggestions", [])
 
@@ -73,28 +55,26 @@ def main() -> None:
         proxy = get_str(cfg, "proxy")
         timeout = get_int(cfg, "timeout_seconds", 60)
 
-        headers = {
-            "accept": "application/json",
-            "content-type": "application/json",
-            "Authorization": api_key
-        }
-
-        session = requests.Session()
-        if proxy:
-            session.proxies.update({"http": proxy, "https": proxy})
+        session = get_session(api_key, proxy)
 
         now = int(time.time())
 
-        for archived_flag in (False, True):
-            suggestions = fetch_suggestions(
-                session=session,
-                headers=headers,
-                is_archived=archived_flag,
-                timeout=timeout
-            )
-
+        # Both lists are independent; fetch them concurrently over the
+        # pooled session, then emit in the original (active, archived) order
+        with ThreadPoolExecutor(max_workers=len(ARCHIVED_FLAGS)) as pool:
+            results = list(pool.map(
+                lambda flag: fetch_suggestions(
+                    session=session,
+                    is_archived=flag,
+                    timeout=timeout
+                ),
+                ARCHIVED_FLAGS,
+            ))
+
+        for archived_flag, suggestions in zip(ARCHIVED_FLAGS, results):
+            tail = suggestion_tail(archived_flag, now)
             for s in suggestions:
-                emit({
+                emit_with_tail({
                     "event_type": "asm_suggestion",
                     "suggestion_id": s.get("id"),
                     "suggestion_text": s.get("suggestion_text"),
@@ -102,9 +82,9 @@ def main() -> None:
                     "rules": s.get("suggestion_details", {}).get("rules", []),
                     "created_at": s.get("created_at"),
                     "deleted_at": s.get("deleted_at"),
-                    "is_archived": archived_flag,
-                    "retrieved_at": now
-                })
+                }, tail)
+
+        flush_events()
 
     except Exception as exc:
         emit({
@@ -112,6 +92,7 @@ def main() -> None:
             "error": str(exc),
             "ts": int(time.time())
         })
+        flush_events()
         sys.exit(1)
 
 
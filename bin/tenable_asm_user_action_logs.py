@@ -1,27 +1,98 @@
+#!/usr/bin/env python3
+# bin/tenable_asm_user_action_logs.py
+#
+# Tenable Attack Surface Management – User Action Logs (raw records)
+# Endpoint: GET /api/1.0/user-action-logs
+#
+# Emits each log record as returned by the API (offset/limit paged)
+
+import functools
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+import requests
+
+from asm_emit import emit, flush_events, parse_json
+from asm_http import get_session, iter_pages
+from asm_settings import get_int, get_str, load_settings
+
 ASM_ENDPOINT = "https://asm.cloud.tenable.com/api/1.0/user-action-logs"
 
-offset = 0
-limit = 100
+# Server-side page maximum (10x fewer round trips than 100)
+PAGE_LIMIT = 1000
+
+# Page requests are spaced out (across all workers) to stay clear of 429s
+MAX_PER_SECOND = 5
+_MIN_INTERVAL = 1.0 / MAX_PER_SECOND
+_last_request = 0.0
+_throttle_lock = threading.Lock()
+
+
+def fetch_page(session: requests.Session, timeout: int, offset: int) -> Dict[str, Any]:
+    global _last_request
+    with _throttle_lock:
+        wait = _last_request + _MIN_INTERVAL - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        _last_request = time.monotonic()
 
-while True:
     params = {
         "offset": offset,
-        "limit": limit
+        "limit": PAGE_LIMIT
     }
 
-    resp = session.get(ASM_ENDPOINT, headers=headers, params=params)
+    resp = session.get(ASM_ENDPOINT, params=params, timeout=timeout)
     resp.raise_for_status()
+    return parse_json(resp)
 
-    payload = resp.json()
-    records = payload.get("list", [])
 
-    if not records:
-        break
+def page_records(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return payload.get("list", [])
 
+
+def emit_page(records: List[Dict[str, Any]]) -> None:
+    # Records go out as returned; asm_emit batches the stdout writes
     for rec in records:
-        print(json.dumps(rec, ensure_ascii=False))
+        emit(rec)
+
+
+def emit_all(fetch: Callable[[int], Dict[str, Any]]) -> None:
+    first = fetch(0)
+    emit_page(page_records(first))
+
+    # Remaining pages via the shared pager (bounded concurrency when the
+    # total is known, serial with prefetch otherwise)
+    for payload in iter_pages(fetch, page_records, first, first.get("total")):
+        emit_page(page_records(payload))
+
+
+def main() -> None:
+    try:
+        cfg = load_settings()
+
+        api_key = get_str(cfg, "api_key")
+        if not api_key:
+            raise RuntimeError("Missing api_key in asm_settings.conf")
+
+        proxy = get_str(cfg, "proxy")
+        timeout = get_int(cfg, "timeout_seconds", 60)
+
+        session = get_session(api_key, proxy)
+
+        emit_all(functools.partial(fetch_page, session, timeout))
+        flush_events()
+
+    except Exception as exc:
+        emit({
+            "event_type": "asm_user_action_log_error",
+            "error": str(exc),
+            "ts": int(time.time())
+        })
+        flush_events()
+        sys.exit(1)
 
-    if len(records) < limit:
-        break
 
-    offset += limit
+if __name__ == "__main__":
+    main()
@@ -4,46 +4,147 @@
 # Tenable Attack Surface Management – User Action Logs
 # Endpoint: GET /api/1.0/logs
 #
-# Emits one event per action log entry
+# Emits one event per action log entry (offset/limit paged), skipping
+# entries already emitted by earlier runs (created_at high-water mark)
 
+import functools
 import json
+import os
 import sys
 import time
 import requests
-import splunk.entity as entity
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Iterator, List, Optional, Set, Tuple
 
-
-APP_NAME = "Tenable_Attack_Surface_Management_for_Splunk"
-CONF_FILE = "asm_settings"
-CONF_STANZA = "settings"
+from asm_emit import emit, flush_events, parse_json
+from asm_http import get_session, iter_pages
+from asm_settings import get_int, get_str, load_settings
 
 BASE_URL = "https://asm.cloud.tenable.com/api/1.0/logs"
 
+# Paging (remaining pages via asm_http.iter_pages)
+# (server max 500; override with user_action_limit in asm_settings.conf)
+PAGE_LIMIT = 500
+MAX_PAGE_LIMIT = 500
+
+# High-water mark: entries older than the last run's max created_at are
+# skipped (ISO-8601 UTC strings, so they compare lexicographically); ids
+# already seen at that timestamp, or with no created_at, are kept alongside
+CHECKPOINT_FILE = "asm_user_actions.ckpt"
+
+# Fixed event schema: keys copied from each log entry, in emission order
+ACTION_KEYS = (
+    "id",
+    "action",
+    "target",
+    "actor",
+    "actor_id",
+    "inventory_id",
+    "description_values",
+    "created_at",
+)
+
+
+def fetch_logs(
+    page_get: Callable[..., requests.Response],
+    offset: int,
+    limit: int
+) -> Dict[str, Any]:
+    resp = page_get(params={"offset": offset, "limit": limit})
+    resp.raise_for_status()
+    return parse_json(resp)
+
+
+def checkpoint_path() -> Optional[str]:
+    db = os.environ.get("SPLUNK_DB")
+    if not db:
+        home = os.environ.get("SPLUNK_HOME")
+        if not home:
+            return None
+        db = os.path.join(home, "var", "lib", "splunk")
+    return os.path.join(db, "modinputs", CHECKPOINT_FILE)
+
+
+def load_checkpoint() -> Tuple[Optional[str], Set[Any], Set[Any]]:
+    """Return (last_created_at, ids at last_created_at, undated ids)."""
+    path = checkpoint_path()
+    if not path:
+        return None, set(), set()
+    try:
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        return (
+            saved.get("last_created_at") or None,
+            set(saved.get("ids_at_last", [])),
+            set(saved.get("undated_ids", [])),
+        )
+    except Exception:
+        return None, set(), set()
+
 
-def emit(event: Dict[str, Any]) -> None:
-    print(json.dumps(event, ensure_ascii=False))
+def save_checkpoint(last_created_at: Optional[str], ids_at_last: Set[Any], undated_ids: Set[Any]) -> None:
+    path = checkpoint_path()
+    if not path:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "last_created_at": last_created_at,
+                "ids_at_last": sorted(ids_at_last, key=str),
+                "undated_ids": sorted(undated_ids, key=str),
+            }, f)
+        os.replace(tmp, path)
+    except Exception:
+        # Worst case the next run re-emits; never fail the run over it
+        pass
 
 
-def load_settings() -> Dict[str, Any]:
-    return entity.getEntity(
-        f"configs/conf-{CONF_FILE}",
-        CONF_STANZA,
-        namespace=APP_NAME,
-        owner="nobody",
-    )
+def _newest_first(logs: List[Dict[str, Any]]) -> bool:
+    stamps = [e.get("created_at") for e in logs]
+    if None in stamps:
+        return False
+    return all(a >= b for a, b in zip(stamps, stamps[1:]))
 
 
-def get_str(cfg: Dict[str, Any], key: str, default: str = "") -> str:
-    val = cfg.get(key)
-    return str(val).strip() if val is not None else default
+def page_logs(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return payload.get("list", [])
 
 
-def get_int(cfg: Dict[str, Any], key: str, default: int) -> int:
-    try:
-        return int(cfg.get(key, default))
-    except Exception:
-        return default
+def _reaches_before(logs: List[Dict[str, Any]], watermark: str) -> bool:
+    last = logs[-1].get("created_at") if logs else None
+    return last is not None and last < watermark
+
+
+def iter_logs(
+    session: requests.Session,
+    limit: int,
+    timeout: int,
+    watermark: Optional[str] = None
+) -> Iterator[Dict[str, Any]]:
+    # URL, timeout and limit bound once for every page request
+    page_get = functools.partial(session.get, BASE_URL, timeout=timeout)
+    fetch = functools.partial(fetch_logs, page_get, limit=limit)
+
+    first = fetch(0)
+    logs = page_logs(first)
+    yield from logs
+
+    if watermark and _newest_first(logs):
+        # Newest-first: walk serially (no total) and stop at the first page
+        # that reaches back before the watermark; older pages are all known
+        # (a page ending exactly on it may be followed by unseen ties)
+        if _reaches_before(logs, watermark):
+            return
+        for page in iter_pages(fetch, page_logs, first):
+            logs = page_logs(page)
+            yield from logs
+            if _reaches_before(logs, watermark):
+                return
+        return
+
+    for page in iter_pages(fetch, page_logs, first, first.get("total")):
+        yield from page_logs(page)
 
 
 def main() -> None:
@@ -56,41 +157,47 @@ def main() -> None:
 
         proxy = get_str(cfg, "proxy")
         timeout = get_int(cfg, "timeout_seconds", 60)
+        limit = max(1, min(get_int(cfg, "user_action_limit", PAGE_LIMIT), MAX_PAGE_LIMIT))
 
-        headers = {
-            "accept": "application/json",
-            "Authorization": api_key
-        }
-
-        session = requests.Session()
-        if proxy:
-            session.proxies.update({"http": proxy, "https": proxy})
-
-        resp = session.get(
-            BASE_URL,
-            headers=headers,
-            timeout=timeout
-        )
-        resp.raise_for_status()
-
-        payload = resp.json()
-        logs = payload.get("list", [])
+        session = get_session(api_key, proxy)
 
         now = int(time.time())
-
-        for entry in logs:
-            emit({
-                "event_type": "asm_user_action",
-                "id": entry.get("id"),
-                "action": entry.get("action"),
-                "target": entry.get("target"),
-                "actor": entry.get("actor"),
-                "actor_id": entry.get("actor_id"),
-                "inventory_id": entry.get("inventory_id"),
-                "description_values": entry.get("description_values"),
-                "created_at": entry.get("created_at"),
-                "retrieved_at": now
-            })
+        watermark, seen_at_mark, seen_undated = load_checkpoint()
+        newest, newest_ids = watermark, set(seen_at_mark)
+        undated_ids = set(seen_undated)
+
+        for entry in iter_logs(session, limit, timeout, watermark):
+            created_at = entry.get("created_at")
+            entry_id = entry.get("id")
+
+            if created_at is None:
+                # No timestamp to compare: dedupe on id alone
+                if entry_id is not None:
+                    if entry_id in seen_undated:
+                        continue
+                    undated_ids.add(entry_id)
+            elif watermark is not None and (
+                created_at < watermark
+                or (created_at == watermark and entry_id in seen_at_mark)
+            ):
+                continue
+            elif newest is None or created_at > newest:
+                newest = created_at
+                newest_ids = {entry_id} if entry_id is not None else set()
+            elif created_at == newest and entry_id is not None:
+                newest_ids.add(entry_id)
+
+            # Field copy runs in C (zip/map over entry.get), not per-key bytecode
+            event = {"event_type": "asm_user_action"}
+            event.update(zip(ACTION_KEYS, map(entry.get, ACTION_KEYS)))
+            event["retrieved_at"] = now
+            emit(event)
+
+        flush_events()
+
+        # Only advance once every new entry has been written out
+        if (newest, newest_ids, undated_ids) != (watermark, seen_at_mark, seen_undated):
+            save_checkpoint(newest, newest_ids, undated_ids)
 
     except Exception as exc:
         emit({
@@ -98,6 +205,7 @@ def main() -> None:
             "error": str(exc),
             "ts": int(time.time())
         })
+        flush_events()
         sys.exit(1)
 
 
@@ -4,52 +4,31 @@
 # Tenable Attack Surface Management – Users
 # Endpoint: GET /api/1.0/admin/users
 
-import json
 import sys
 import time
-import requests
-import splunk.entity as entity
-from typing import Dict, Any, List
 
-APP_NAME = "Tenable_Attack_Surface_Management_for_Splunk"
-CONF_FILE = "asm_settings"
-CONF_STANZA = "settings"
+from asm_emit import emit, emit_with_tail, flush_events, iter_items
+from asm_http import get_session
+from asm_settings import get_int, get_str, load_settings
 
 API_URL = "https://asm.cloud.tenable.com/api/1.0/admin/users"
 
-
-def emit(event: Dict[str, Any]) -> None:
-    print(json.dumps(event, ensure_ascii=False))
-
-
-def load_settings() -> Dict[str, Any]:
-    return entity.getEntity(
-        f"configs/conf-{CONF_FILE}",
-        CONF_STANZA,
-        namespace=APP_NAME,
-        owner="nobody",
-    )
-
-
-def get_str(cfg: Dict[str, Any], key: str, default: str = "") -> str:
-    val = cfg.get(key)
-    return str(val).strip() if val is not None else default
-
-
-def get_int(cfg: Dict[str, Any], key: str, default: int) -> int:
-    try:
-        return int(cfg.get(key, default))
-    except Exception:
-        return default
-
-
-def flatten_companies(companies: List[Dict[str, Any]]) -> List[str]:
-    names = []
-    for c in companies or []:
-        name = c.get("name")
-        if name:
-            names.append(name)
-    return names
+# Fixed event schema: output key -> source key, in emission order
+USER_FIELDS = (
+    ("user_id", "id"),
+    ("email", "email"),
+    ("authid", "authid"),
+    ("access_level", "access_level"),
+    ("created_at", "created_at"),
+    ("first_login", "first_login"),
+    ("mfa", "mfa"),
+    ("ext_user_id", "ext_user_id"),
+    ("workspace", "workspace"),
+    ("business_id", "business_id"),
+    ("user_inventories_limit", "user_inventories_limit"),
+)
+USER_OUT_KEYS = tuple(out for out, _ in USER_FIELDS)
+USER_SRC_KEYS = tuple(src for _, src in USER_FIELDS)
 
 
 def main() -> None:
@@ -63,40 +42,24 @@ def main() -> None:
         proxy = get_str(cfg, "proxy")
         timeout = get_int(cfg, "timeout_seconds", 60)
 
-        headers = {
-            "accept": "application/json",
-            "Authorization": api_key
-        }
+        session = get_session(api_key, proxy)
 
-        session = requests.Session()
-        if proxy:
-            session.proxies.update({"http": proxy, "https": proxy})
-
-        resp = session.get(API_URL, headers=headers, timeout=timeout)
+        resp = session.get(API_URL, timeout=timeout, stream=True)
         resp.raise_for_status()
 
-        payload = resp.json()
-        users = payload.get("list", [])
-
-        now = int(time.time())
-
-        for user in users:
-            emit({
-                "event_type": "asm_user",
-                "user_id": user.get("id"),
-                "email": user.get("email"),
-                "authid": user.get("authid"),
-                "access_level": user.get("access_level"),
-                "created_at": user.get("created_at"),
-                "first_login": user.get("first_login"),
-                "mfa": user.get("mfa"),
-                "ext_user_id": user.get("ext_user_id"),
-                "workspace": user.get("workspace"),
-                "business_id": user.get("business_id"),
-                "user_inventories_limit": user.get("user_inventories_limit"),
-                "companies": flatten_companies(user.get("companies")),
-                "retrieved_at": now
-            })
+        # retrieved_at is the same for every user: serialized once per run
+        tail = b',"retrieved_at":%d}\n' % int(time.time())
+
+        for user in iter_items(resp, "list"):
+            # Field copy runs in C (zip/map over user.get), not per-key bytecode
+            event = {"event_type": "asm_user"}
+            event.update(zip(USER_OUT_KEYS, map(user.get, USER_SRC_KEYS)))
+            event["companies"] = [
+                c["name"] for c in user.get("companies") or () if c.get("name")
+            ]
+            emit_with_tail(event, tail)
+
+        flush_events()
 
     except Exception as exc:
         emit({
@@ -104,6 +67,7 @@ def main() -> None:
             "error": str(exc),
             "ts": int(time.time())
         })
+        flush_events()
         sys.exit(1)
 
 